@@ -1,6 +1,8 @@
-import string
 import collections
-from itertools import islice, zip_longest, cycle
+import functools
+import os
+import struct
+from itertools import repeat
 from math import log10
 
 """
@@ -17,6 +19,22 @@ WHITESPACE = [10, 32]
 # Anything outside this range will be rejected with a score of None
 VALID_ASCII_BYTES = WHITESPACE + list(range(33, 128))
 
+# a lookup table indexed by byte value: VALID_BYTE_TABLE[b] is 1 if b is in VALID_ASCII_BYTES, else 0.
+# Indexing the table is a constant time check, where `b in VALID_ASCII_BYTES` has to scan the list
+VALID_BYTE_TABLE = bytes(1 if b in VALID_ASCII_BYTES else 0 for b in range(256))
+
+# VALID_ASCII_BYTES as bytes, for use as the `delete` argument of bytes.translate(). Whatever is left of a block
+# after deleting these bytes are its invalid bytes
+VALID_BYTES = bytes(VALID_ASCII_BYTES)
+
+# a bytes.translate() table that lowercases ASCII letters
+TO_LOWERCASE = bytes.maketrans(bytes(range(65, 91)), bytes(range(97, 123)))
+
+# every byte that is not an ASCII letter, for the `delete` argument of bytes.translate().
+# Together, `block.translate(TO_LOWERCASE, DELETE_NON_LETTERS)` filters a block down to just its letters
+# (as lowercase) in a single pass, without first making a lowercase copy of the block
+DELETE_NON_LETTERS = bytes(b for b in range(256) if not (65 <= b <= 90 or 97 <= b <= 122))
+
 # maps a lowercase ascii letter to its frequency within english text
 FREQUENCIES = {
     97: 0.08167,
@@ -50,26 +68,77 @@ FREQUENCIES = {
 # sum of all the quad counts in the file english_quadgrams.txt
 TOTAL_QUAD_COUNT: int = 4224127912
 
+# the log probability given to a quadgram that is not in english_quadgrams.txt
+MISS_LOG: float = log10(0.01 / TOTAL_QUAD_COUNT)
+
+# the english quadgram counts, and the same quadgrams pre-processed into a binary table (see write_quadgram_table)
+QUADGRAM_TEXT_FILE = "./files/english_quadgrams.txt"
+QUADGRAM_TABLE_FILE = "./files/english_quadgrams.bin"
+
+
 
-def _build_quadgram_dict() -> dict[tuple, float]:
+def _parse_quadgram_file() -> dict[int, float]:
     """
-    loads and returns a dictionary that maps the four letters of an english quadgram to the probability of
-    it occurring in text. The letters are stored as a four-tuple of int. Each int is the ASCII value of that letter.
+    parses english_quadgrams.txt and returns a dictionary that maps the four letters of an english quadgram to the
+    probability of it occurring in text. The four ASCII values of the letters are packed, big-endian, into a single
+    32-bit int key, as an int hashes much faster than a four-tuple would.
     The values are the probability score of that quadgram
     """
     d = dict()
-    with open("./files/english_quadgrams.txt") as file:
-        for readline in file.readlines():
-            quad, count = readline.rstrip("\n").split(" ")
-            quad = tuple(bytes(quad.lower(), encoding="ascii"))
-            count = int(count, 10)
+    with open(QUADGRAM_TEXT_FILE) as file:
+        # iterate the file, rather than readlines(), so the lines are streamed instead of all held in memory
+        for readline in file:
+            quad, count = readline.rstrip().split(" ")
+            quad = int.from_bytes(bytes(quad.lower(), encoding="ascii"), "big")
+            count = int(count)
             prob = log10(count / TOTAL_QUAD_COUNT)
             d[quad] = prob
     return d
 
 
-# build the dictionary when this module is loaded
-QUADGRAM_PROBS = _build_quadgram_dict()
+def write_quadgram_table():
+    """
+    writes the quadgram probabilities parsed from english_quadgrams.txt to the binary quadgram table file.
+    The table is an array of the (sorted) packed quadgram keys as little-endian uint32, followed by an
+    array of their probabilities, in the same order, as little-endian float64.
+    This only needs to be run again if english_quadgrams.txt changes
+    """
+    probs = _parse_quadgram_file()
+    keys = sorted(probs)
+    values = [probs[key] for key in keys]
+    with open(QUADGRAM_TABLE_FILE, "wb") as file:
+        file.write(struct.pack(f"<{len(keys)}I", *keys))
+        file.write(struct.pack(f"<{len(values)}d", *values))
+
+
+def _build_quadgram_dict() -> dict[int, float]:
+    """
+    loads and returns the dictionary of quadgram probabilities described in `_parse_quadgram_file`.
+    The dictionary is read from the binary quadgram table (see `write_quadgram_table`), which loads far faster than
+    parsing english_quadgrams.txt, and falls back to parsing the text file if the table does not exist.
+    raises a RuntimeError if the table is not a whole number of (key, value) entries
+    """
+    if not os.path.exists(QUADGRAM_TABLE_FILE):
+        return _parse_quadgram_file()
+    with open(QUADGRAM_TABLE_FILE, "rb") as file:
+        table = file.read()
+    # each quadgram takes one key and one value in the table
+    entry_size = struct.calcsize("<Id")
+    if len(table) % entry_size != 0:
+        raise RuntimeError(f"{QUADGRAM_TABLE_FILE} is corrupt, its size is not a multiple of {entry_size} bytes")
+    count = len(table) // entry_size
+    keys = struct.unpack_from(f"<{count}I", table)
+    values = struct.unpack_from(f"<{count}d", table, struct.calcsize(f"<{count}I"))
+    return dict(zip(keys, values))
+
+
+@functools.cache
+def _quadgram_probs() -> dict[int, float]:
+    """
+    returns the dictionary of quadgram probabilities built by `_build_quadgram_dict`. The dictionary is only built
+    the first time this is called, so code that imports this module but never scores quadgrams doesn't load it
+    """
+    return _build_quadgram_dict()
 
 
 def quadgram_score(block: bytes) -> float | None:
@@ -79,43 +148,43 @@ def quadgram_score(block: bytes) -> float | None:
     :return: a float < 0.0 if the block might be english. returns None if the block is not English text, for
     example, if the block has no letters in it at all.
     """
-    if not any(map(lambda b: b in VALID_ASCII_BYTES, block)):
-        return None
     # we want at least one space character in the block, ideally we would check for some percentage of spaces
+    # (a space is itself a valid byte, so this also ensures the block has at least one valid byte)
     if 32 not in block:
         return None
 
     # now filter out all letters and convert them to lowercase
-    letters = [b for b in block.lower() if chr(b) in string.ascii_lowercase]
-    letters = bytes(letters)
+    letters = block.translate(TO_LOWERCASE, DELETE_NON_LETTERS)
 
     # we want the majority of characters in the block to be letters, try 50% as a starting point
     if len(letters) < (len(block) * 0.5):
         return None
 
-    # partition the letters into quadgrams and compute the score
+    # partition the letters into quadgrams, packed the same way as the quadgram dictionary keys, and compute the
+    # score. quadgrams that are not in the dictionary are given a very small probability, MISS_LOG.
+    quads = _pack_quadgrams(letters)
+    probs = map(_quadgram_probs().get, quads, repeat(MISS_LOG))
+    # (sum() is not used as python 3.12+ compensates float sums, which would change the scores slightly)
     prob = 0.0
-    for quad in _sliding_window(letters, 4):
-        if quad in QUADGRAM_PROBS:
-            prob += QUADGRAM_PROBS[quad]
-        else:
-            prob += log10(0.01 / TOTAL_QUAD_COUNT)
+    for quad_prob in probs:
+        prob += quad_prob
 
     return prob
 
 
-def _sliding_window(iterable, n):
+def _pack_quadgrams(letters: bytes) -> list[int]:
     """
-    builds a sliding window of length 'n' over the iterable and returns them as an iterable of tuples.
-    sliding_window('ABCDEFG', 4) -> ABCD BCDE CDEF DEFG
+    returns every (overlapping) quadgram of letters, in order, packed the same way as the quadgram dictionary keys.
+    _pack_quadgrams(b'ABCDEF') -> [packed ABCD, packed BCDE, packed CDEF]
+    The quadgrams starting at offsets 0, 4, 8... are non-overlapping, so they can all be unpacked as big-endian
+    uint32 with a single struct.unpack call, and likewise for the quadgrams starting at offsets 1, 2 and 3.
+    The four results are then interleaved back into order.
     """
-    it = iter(iterable)
-    window = collections.deque(islice(it, n), maxlen=n)
-    if len(window) == n:
-        yield tuple(window)
-    for x in it:
-        window.append(x)
-        yield tuple(window)
+    quads = [0] * max(len(letters) - 3, 0)
+    for offset in range(4):
+        count = max(len(letters) - offset, 0) // 4
+        quads[offset::4] = struct.unpack(f">{count}I", letters[offset:offset + 4 * count])
+    return quads
 
 
 def repeating_xor(block: bytes, key: bytes) -> bytes:
@@ -123,15 +192,22 @@ def repeating_xor(block: bytes, key: bytes) -> bytes:
     XORs the bytes in block with key, cycling the bytes in key as needed to fully XOR every byte of block
     :return: the XORed bytes
     """
-    return bytes(map(lambda pair: pair[0] ^ pair[1], islice(zip_longest(block, cycle(key)), len(block))))
+    # repeat the key out to the length of block, then XOR both buffers as (big) ints in one C-level operation
+    key_stream = (key * (len(block) // len(key) + 1))[:len(block)]
+    xored = int.from_bytes(block, "big") ^ int.from_bytes(key_stream, "big")
+    return xored.to_bytes(len(block), "big")
 
 
 def fixed_xor(buf1: bytes, buf2: bytes) -> bytearray:
     """
-    XOR corresponding bytes in buf1 and buf2 and returns the result as a new bytearray
+    XOR corresponding bytes in buf1 and buf2 and returns the result as a new bytearray.
+    Only the first len(buf1) bytes of buf2 are used, raises an IndexError if buf2 is shorter than buf1
     """
-    xored = [buf1[i] ^ buf2[i] for i in range(len(buf1))]
-    return bytearray(xored)
+    if len(buf2) < len(buf1):
+        raise IndexError("buf2 must be at least as long as buf1")
+    # XOR the buffers as ints
+    xored = int.from_bytes(buf1, "big") ^ int.from_bytes(buf2[:len(buf1)], "big")
+    return bytearray(xored.to_bytes(len(buf1), "big"))
 
 
 def chunks(lst, n):
@@ -144,7 +220,8 @@ def valid_english_byte(b: int) -> bool:
     """
     returns true if the given byte, b, is an ASCII digit, letter, punctuation, space or linefeed; else false
     """
-    return b in VALID_ASCII_BYTES
+    # ints outside the range of a byte are never valid (and would index past, or wrap around, the table)
+    return 0 <= b < 256 and VALID_BYTE_TABLE[b] == 1
 
 
 def chi2_score(block: bytes) -> float | None:
@@ -155,31 +232,63 @@ def chi2_score(block: bytes) -> float | None:
     :return: the chi squared score for the text. If the block is not english at all, meaning that no letters
     were found in the block, None is returned
     """
-    # every byte in block must be a "valid" character
-    if not all(map(lambda b: valid_english_byte(b), block)):
+    # every byte in block must be a "valid" character, i.e. nothing is left once the valid bytes are deleted
+    if block.translate(None, VALID_BYTES):
         return None
     # there should be at least one space character in block
-    if not any(map(lambda b: b == 32, block)):
+    if 32 not in block:
         return None
+    letters = block.translate(TO_LOWERCASE, DELETE_NON_LETTERS)
     # build a frequency map of all lower case letters in block, with a count of how many
     # times that letter occurs in block
-    letter_counts = collections.Counter(filter(lambda b: b in range(97, 123), block.lower()))
-    total_letters = letter_counts.total()
+    letter_counts = collections.Counter(letters)
+    return _chi2_letter_score(letter_counts, len(letters))
 
+
+def _chi2_letter_score(letter_counts: collections.Counter, total_letters: int) -> float | None:
+    """
+    computes the chi squared score of a frequency map of lower case letters (as built by `chi2_score`), where
+    `total_letters` is the sum of all the counts in the map. returns None if there are no letters in the map
+    """
     # there's gotta be letters in the block in order to be english
     if total_letters == 0:
         return None
 
     # compute
     score = 0.0
-    for letter in letter_counts.keys():
-        count = letter_counts[letter]
+    for letter, count in letter_counts.items():
         expected = total_letters * FREQUENCIES[letter]
         score += pow(count - expected, 2) / expected
 
     return score
 
 
+def _xored_chi2_score(histogram: collections.Counter, c: int) -> float | None:
+    """
+    computes the same score as `chi2_score` for a block that has been XORed with the single byte `c`, but works
+    from `histogram`, a Counter of the bytes in the un-XORed block. Because XOR with a single byte just
+    relabels each distinct byte value, the block itself never has to be XORed or scanned again, and the
+    work done is proportional to the number of distinct bytes (at most 256) rather than the length of the block.
+    """
+    # every byte in the xored block must be a "valid" character
+    if not all(VALID_BYTE_TABLE[b ^ c] for b in histogram):
+        return None
+    # there should be at least one space character in the xored block
+    if 32 ^ c not in histogram:
+        return None
+    # build the frequency map of lower case letters. The Counter keeps its bytes in the order they first
+    # occurred in the block, so the letters are summed in the same order as `chi2_score` would sum them
+    letter_counts = collections.Counter()
+    total_letters = 0
+    for b, count in histogram.items():
+        # setting bit 5 lower-cases an upper case ASCII letter
+        letter = (b ^ c) | 32
+        if 97 <= letter <= 122:
+            letter_counts[letter] += count
+            total_letters += count
+    return _chi2_letter_score(letter_counts, total_letters)
+
+
 def hamming(bs1: bytes, bs2: bytes) -> int:
     """
     returns the total number of bits that differ between corresponding bytes of `bs1` and `bs2`
@@ -187,13 +296,8 @@ def hamming(bs1: bytes, bs2: bytes) -> int:
     """
     if len(bs1) != len(bs2):
         raise RuntimeError("bytes must be equal length in order to compute hamming distance")
-    count = 0
-    for b1, b2 in zip_longest(bs1, bs2):
-        xor = b1 ^ b2
-        while xor > 0:
-            xor &= xor - 1
-            count += 1
-    return count
+    # count the set bits in the XOR of the buffers
+    return (int.from_bytes(bs1, "big") ^ int.from_bytes(bs2, "big")).bit_count()
 
 
 def break_single_byte_xor(block: bytes) -> (float | None, int | None):
@@ -204,19 +308,19 @@ def break_single_byte_xor(block: bytes) -> (float | None, int | None):
     character. `None` is returned if the block could not be decrypted because the scoring algorithm did not
     recognize it as english
     """
+    # count the bytes of block once, each candidate key is then scored from these counts
+    histogram = collections.Counter(block)
     scores = []
     for c in range(256):
-        single_bytes = bytes([c] * len(block))
-        xored = fixed_xor(block, single_bytes)
-        score = chi2_score(xored)
+        score = _xored_chi2_score(histogram, c)
         if score:
-            # print("scored {}({}) {:7.4} ||{}||".format(c, str(c), score, xored.decode(encoding="ascii")))
-            scores.append((c, score, xored))
+            # print("scored {}({}) {:7.4}".format(c, str(c), score))
+            scores.append((c, score))
     scores.sort(key=lambda s: s[1])
 
     # print top 3 scores
     # for s in scores[0:3]:
-    #     print("    score {}({}) {:7.4} ||{}||".format(s[0], str(s[0]), s[1], s[2].decode(encoding="ascii")))
+    #     print("    score {}({}) {:7.4}".format(s[0], str(s[0]), s[1]))
 
     if len(scores) > 0:
         return scores[0][1], scores[0][0]
@@ -1,6 +1,6 @@
 import base64
 from itertools import islice
-from crypto_utils import fixed_xor, break_single_byte_xor, repeating_xor, hamming, chunks
+from crypto_utils import fixed_xor, break_single_byte_xor, repeating_xor, hamming
 
 """
 Cryptopals Challenges Set 1
@@ -35,7 +35,7 @@ def single_byte_xor_cipher(s: str) -> str:
     """
     bs = bytes.fromhex(s)
     (score, key) = break_single_byte_xor(bs)
-    plaintext = fixed_xor(bs, bytearray([key] * len(bs)))
+    plaintext = fixed_xor(bs, bytes((key,)) * len(bs))
     return plaintext.decode(encoding="ascii")
 
 
@@ -46,7 +46,7 @@ def detect_single_byte_xor() -> str | None:
     """
     scores = []
     with open("./files/4.txt", "r") as file:
-        for readline in file.readlines():
+        for readline in file:
             line = readline.rstrip("\n")
             bs = bytes.fromhex(line)
             result = break_single_byte_xor(bs)
@@ -56,7 +56,7 @@ def detect_single_byte_xor() -> str | None:
     if len(scores) > 0:
         scores.sort(key=lambda s: s[0])
         best_score, best_key, best_line = scores[0]
-        plaintext = fixed_xor(best_line, bytearray([best_key] * len(best_line)))
+        plaintext = fixed_xor(best_line, bytes((best_key,)) * len(best_line))
         print(f"best score {best_score:8.3} {best_key}, {plaintext}")
         return plaintext.decode(encoding="ascii")
     else:
@@ -88,9 +88,11 @@ def break_repeating_key_xor():
     #  Compare FIRST and SECOND keysize worth of bytes, find hamming distance between them and
     #  normalize result by dividing by keysize
     # The keysize with the smallest normalized edit distance is "probably" the key
+    # a memoryview lets the keysize chunks below be sliced out of xored without copying them
+    view = memoryview(xored)
     probable_keys = []
     for keysize in range(2, 41):
-        chunk = list(islice(chunks(xored, keysize), 4))
+        chunk = [view[i * keysize:(i + 1) * keysize] for i in range(4)]
         d1 = hamming(chunk[0], chunk[1]) / keysize
         d2 = hamming(chunk[1], chunk[2]) / keysize
         d3 = hamming(chunk[2], chunk[3]) / keysize
@@ -111,9 +113,9 @@ def break_repeating_key_xor():
     for keysize in keysizes:
         byte_blocks = []
 
-        # build the byte_blocks
+        # build the byte_blocks, an extended slice of xored picks out every keysize'th byte in one step
         for k in range(0, keysize):
-            block = list(islice(xored[k:], 0, None, keysize))
+            block = xored[k::keysize]
             byte_blocks.append(block)
 
         # now try to guess the single byte key for each byte_block
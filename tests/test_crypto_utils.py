@@ -1,5 +1,6 @@
 from unittest import TestCase
-from crypto_utils import quadgram_score, chi2_score, repeating_xor, hamming
+from crypto_utils import quadgram_score, chi2_score, repeating_xor, fixed_xor, hamming, break_single_byte_xor, \
+    _build_quadgram_dict, _parse_quadgram_file
 
 
 class Test(TestCase):
@@ -32,3 +33,24 @@ class Test(TestCase):
         b2 = b"FYYFHP YMJ JFXY BFQQ TK YMJ HFXYQJ FY IFBS"
         score2 = quadgram_score(b2)
         self.assertEqual(score2, -302.3543701340869)
+
+    def test_break_single_byte_xor(self):
+        plain = b"ATTACK THE EAST WALL OF THE CASTLE AT DAWN"
+        encrypted = bytes(b ^ 88 for b in plain)
+        score, key = break_single_byte_xor(encrypted)
+        self.assertEqual(key, 88)
+        self.assertEqual(score, chi2_score(plain))
+
+    def test_quadgram_table_matches_text_file(self):
+        # english_quadgrams.bin must be regenerated with write_quadgram_table() whenever english_quadgrams.txt changes
+        self.assertEqual(_build_quadgram_dict(), _parse_quadgram_file())
+
+    def test_fixed_xor(self):
+        buf1 = bytes.fromhex("1c0111001f010100061a024b53535009181c")
+        buf2 = bytes.fromhex("686974207468652062756c6c277320657965")
+        expected = bytearray.fromhex("746865206b696420646f6e277420706c6179")
+        self.assertEqual(fixed_xor(buf1, buf2), expected)
+        # only the first len(buf1) bytes of a longer buf2 are used
+        self.assertEqual(fixed_xor(buf1, buf2 + b"\xff\xff"), expected)
+        with self.assertRaises(IndexError):
+            fixed_xor(buf1, buf2[:-1])